@@ -0,0 +1,328 @@
+import numpy as np
+import pandas as pd
+from compressedio import open_text
+
+IMAGE_FIELDS = ['image_name', 'image_path', 'image_width', 'image_height',
+                'site_name', 'usr', 'project_id', 'created_at']
+ANNOTATION_FIELDS = ['x1', 'y1', 'x2', 'y2', 'classname', 'contour']
+
+
+class ImageRecord:
+    """
+    One image of an AnnotationStore.
+
+    Behaves like the old per-image dict (`image['image_path']`,
+    `image['annotations']`, ...) so existing callers keep working, but
+    keeps site and user as integer codes and its annotations as a
+    [start, stop) range into the store's arrays.
+    """
+    __slots__ = ('store', 'image_name', 'image_path', 'image_width', 'image_height',
+                 'site_code', 'email_code', 'project_id', 'created_at', 'start', 'stop')
+
+    def __init__(self, store, image_name, image_path, image_width, image_height,
+                 site_code, email_code, project_id, created_at, start, stop):
+        self.store = store
+        self.image_name = image_name
+        self.image_path = image_path
+        self.image_width = image_width
+        self.image_height = image_height
+        self.site_code = site_code
+        self.email_code = email_code
+        self.project_id = project_id
+        self.created_at = created_at
+        self.start = start
+        self.stop = stop
+
+    @property
+    def site_name(self):
+        return self.store.sites[self.site_code]
+
+    @property
+    def usr(self):
+        return self.store.emails[self.email_code]
+
+    @property
+    def annotations(self):
+        """Zero-copy view over this image's annotations"""
+        return AnnotationView(self.store, self.start, self.stop)
+
+    def __getitem__(self, key):
+        if key in IMAGE_FIELDS or key == 'annotations':
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in IMAGE_FIELDS or key == 'annotations'
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def to_dict(self):
+        """Materialize the old nested dict format for this image"""
+        record = {field: getattr(self, field) for field in IMAGE_FIELDS}
+        record['annotations'] = list(self.annotations)
+        return record
+
+    def __repr__(self):
+        return (f"ImageRecord(image_path={self.image_path!r}, "
+                f"annotations={self.stop - self.start})")
+
+
+class AnnotationView:
+    """
+    Zero-copy slice of the annotations of one or more consecutive images.
+
+    Coordinate and class code attributes are NumPy views into the parent
+    store; iterating yields one annotation dict at a time.
+    """
+    __slots__ = ('store', 'start', 'stop')
+
+    def __init__(self, store, start, stop):
+        self.store = store
+        self.start = start
+        self.stop = stop
+
+    @property
+    def x1(self):
+        return self.store.x1[self.start:self.stop]
+
+    @property
+    def y1(self):
+        return self.store.y1[self.start:self.stop]
+
+    @property
+    def x2(self):
+        return self.store.x2[self.start:self.stop]
+
+    @property
+    def y2(self):
+        return self.store.y2[self.start:self.stop]
+
+    @property
+    def class_codes(self):
+        return self.store.class_codes[self.start:self.stop]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.store.annotation(self.start + i)
+
+    def __iter__(self):
+        for i in range(self.start, self.stop):
+            yield self.store.annotation(i)
+
+
+class AnnotationStore:
+    """
+    Compact in-memory container for images and their annotations.
+
+    Image-level fields live in one `__slots__` ImageRecord per image.
+    Annotation fields are columnar: x1/y1/x2/y2 are float64 arrays,
+    classname is an int32 code into `classnames`, and contours are stored
+    back to back as UTF-8 JSON in one bytes buffer indexed by
+    `contour_offsets` (annotation i spans offsets[i]:offsets[i + 1]).
+    Annotations of one image are contiguous, so per-image access is a
+    slice rather than a copy.
+
+    Iterating yields ImageRecord objects that support the same key access
+    as the dicts previously returned by `convert_csv_to_image_data`.
+    """
+
+    def __init__(self, images, x1, y1, x2, y2, class_codes, classnames,
+                 sites, emails, contour_buffer, contour_offsets):
+        self.images = images
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.class_codes = class_codes
+        self.classnames = classnames
+        self.sites = sites
+        self.emails = emails
+        self.contour_buffer = contour_buffer
+        self.contour_offsets = contour_offsets
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """
+        Build a store from a DataFrame in the CSV column layout.
+
+        Rows are grouped by image_path, keeping images in order of first
+        appearance and annotations in their original order within each image.
+
+        Raises:
+            ValueError: If any row has no image_path
+        """
+        df = df.copy()
+        df.columns = df.columns.str.strip()
+
+        missing = df.index[df['image_path'].isna()]
+        if len(missing):
+            shown = ', '.join(map(str, missing[:10]))
+            more = f" (and {len(missing) - 10} more)" if len(missing) > 10 else ""
+            raise ValueError(f"Rows without image_path: {shown}{more}")
+
+        image_codes, _ = pd.factorize(df['image_path'])
+        order = np.argsort(image_codes, kind='stable')
+        df = df.iloc[order].reset_index(drop=True)
+        counts = np.bincount(image_codes)
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+
+        class_codes, classnames = pd.factorize(df['classname'], use_na_sentinel=False)
+
+        contours = df['contour'].where(df['contour'].notna(), '')
+        encoded = [str(c).encode('utf-8') for c in contours]
+        contour_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)),
+                  out=contour_offsets[1:])
+
+        firsts = df.iloc[bounds[:-1]]
+        site_codes, sites = pd.factorize(firsts['site_name'], use_na_sentinel=False)
+        email_codes, emails = pd.factorize(firsts['email'], use_na_sentinel=False)
+
+        store = cls(
+            images=[],
+            x1=df['x1'].to_numpy(dtype=np.float64),
+            y1=df['y1'].to_numpy(dtype=np.float64),
+            x2=df['x2'].to_numpy(dtype=np.float64),
+            y2=df['y2'].to_numpy(dtype=np.float64),
+            class_codes=class_codes.astype(np.int32),
+            classnames=list(classnames),
+            sites=list(sites),
+            emails=list(emails),
+            contour_buffer=b''.join(encoded),
+            contour_offsets=contour_offsets
+        )
+
+        store.images = [
+            ImageRecord(store, name, path, int(width), int(height), int(site), int(email),
+                        int(project), created_at, int(start), int(stop))
+            for name, path, width, height, site, email, project, created_at, start, stop in zip(
+                firsts['image_name'], firsts['image_path'],
+                firsts['image_width'], firsts['image_height'],
+                site_codes, email_codes, firsts['project_id'], firsts['created_at'],
+                bounds[:-1], bounds[1:])
+        ]
+        return store
+
+    @classmethod
+    def from_csv(cls, csv_file):
+        """Build a store from a (optionally .gz / .zst compressed) CSV file"""
+        with open_text(csv_file, 'r', newline='') as f:
+            return cls.from_dataframe(pd.read_csv(f))
+
+    def contour(self, i):
+        """Contour JSON string of annotation i ('' if it has none)"""
+        start, stop = self.contour_offsets[i], self.contour_offsets[i + 1]
+        return self.contour_buffer[start:stop].decode('utf-8')
+
+    def annotation(self, i):
+        """Annotation i as a dict in the old nested format"""
+        return {
+            'x1': float(self.x1[i]),
+            'y1': float(self.y1[i]),
+            'x2': float(self.x2[i]),
+            'y2': float(self.y2[i]),
+            'classname': self.classnames[self.class_codes[i]],
+            'contour': self.contour(i)
+        }
+
+    @property
+    def n_annotations(self):
+        return sum(image.stop - image.start for image in self.images)
+
+    def __len__(self):
+        return len(self.images)
+
+    def __iter__(self):
+        return iter(self.images)
+
+    def __getitem__(self, key):
+        """
+        store[i] returns an ImageRecord; store[a:b] returns a store over the
+        selected images that shares all annotation arrays with this one.
+        """
+        if isinstance(key, slice):
+            return self.select(self.images[key])
+        return self.images[key]
+
+    def select(self, images):
+        """Store over a subset of this store's images, sharing all arrays"""
+        return AnnotationStore(
+            list(images), self.x1, self.y1, self.x2, self.y2,
+            self.class_codes, self.classnames, self.sites, self.emails,
+            self.contour_buffer, self.contour_offsets)
+
+    def distinct_classnames(self):
+        """Set of class names used by the images in this store"""
+        if not self.images:
+            return set()
+        codes = np.unique(np.concatenate([self.class_codes[image.start:image.stop] for image in self.images]))
+        return {self.classnames[code] for code in codes}
+
+    def distinct_emails(self):
+        """Set of user emails of the images in this store"""
+        return {self.emails[code] for code in {image.email_code for image in self.images}}
+
+    def iter_rows(self):
+        """Yield one flat row dict per annotation in CSV column layout"""
+        for image in self.images:
+            for i in range(image.start, image.stop):
+                yield {
+                    'image_name': image.image_name,
+                    'image_path': image.image_path,
+                    'image_width': image.image_width,
+                    'image_height': image.image_height,
+                    'site_name': image.site_name,
+                    'email': image.usr,
+                    'project_id': image.project_id,
+                    'created_at': image.created_at,
+                    **self.annotation(i)
+                }
+
+    def to_dataframe(self):
+        """Expand the store back to one row per annotation in CSV column layout"""
+        if not self.images:
+            return pd.DataFrame(columns=['image_name', 'image_path', 'image_width', 'image_height',
+                                         'site_name', 'email', 'project_id', 'created_at',
+                                         *ANNOTATION_FIELDS])
+        counts = np.array([image.stop - image.start for image in self.images], dtype=np.int64)
+        index = np.concatenate([np.arange(image.start, image.stop) for image in self.images])
+
+        def repeat(attr):
+            return np.repeat(np.array([getattr(image, attr) for image in self.images], dtype=object),
+                             counts)
+
+        offsets = self.contour_offsets
+        contours = [self.contour_buffer[offsets[i]:offsets[i + 1]].decode('utf-8') for i in index]
+        return pd.DataFrame({
+            'image_name': repeat('image_name'),
+            'image_path': repeat('image_path'),
+            'image_width': repeat('image_width'),
+            'image_height': repeat('image_height'),
+            'site_name': repeat('site_name'),
+            'email': repeat('usr'),
+            'project_id': repeat('project_id'),
+            'created_at': repeat('created_at'),
+            'x1': self.x1[index],
+            'y1': self.y1[index],
+            'x2': self.x2[index],
+            'y2': self.y2[index],
+            'classname': np.asarray(self.classnames, dtype=object)[self.class_codes[index]],
+            'contour': contours
+        })
+
+    def to_csv(self, csv_file):
+        """Write the store to CSV, compressed according to the file extension"""
+        df = self.to_dataframe()
+        with open_text(csv_file, 'w', newline='') as f:
+            df.to_csv(f, index=False)
+        return df
+
+    def __repr__(self):
+        return f"AnnotationStore(images={len(self)}, annotations={self.n_annotations})"
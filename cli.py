@@ -0,0 +1,213 @@
+"""
+Command line entry point for the data-manager scripts.
+
+    python cli.py labelstudio EXPORT_DIR [-o tasks.json] [--manifest m.json]
+    python cli.py json2csv tasks.json annotations.csv.gz
+    python cli.py csv2json annotations.csv.gz tasks.json
+    python cli.py upload annotations.csv [--upsert] [--new-names create] [--yes]
+    python cli.py reconstruct out.csv.zst [--project-id 3]
+
+Only argparse and the standard library are imported at startup; pandas,
+mysql.connector and PIL are imported by the subcommand that needs them.
+Set --timing-log (or DATAMANAGER_TIMING_LOG) to append one JSON line per
+run with startup, import and run times.
+"""
+import argparse
+import builtins
+import contextlib
+import importlib
+import json
+import os
+import sys
+import time
+
+_STARTED = time.perf_counter()
+
+
+class _Timings:
+    def __init__(self):
+        self.import_s = 0.0
+        self._depth = 0
+
+    def _timed(self, func, *args, **kwargs):
+        # Only the outermost import is timed so nested imports are not counted twice
+        if self._depth:
+            return func(*args, **kwargs)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.import_s += time.perf_counter() - start
+            self._depth -= 1
+
+    def load(self, module_name):
+        """Import a module lazily, accounting the time spent as import time"""
+        return self._timed(importlib.import_module, module_name)
+
+    @contextlib.contextmanager
+    def track(self):
+        """Also account `import` statements executed inside function bodies"""
+        original = builtins.__import__
+        builtins.__import__ = lambda *args, **kwargs: self._timed(original, *args, **kwargs)
+        try:
+            yield self
+        finally:
+            builtins.__import__ = original
+
+
+def _connection(args):
+    return {"host": args.host, "user": args.user, "password": args.password, "database": args.database}
+
+
+def cmd_labelstudio(args, timings):
+    yolo = timings.load("yolotolabelstudio")
+    yolo.create_label_studio_json(
+        args.images or os.path.join(args.export_dir, "images"),
+        args.labels or os.path.join(args.export_dir, "labels"),
+        args.notes or os.path.join(args.export_dir, "notes.json"),
+        output_path=args.output,
+        manifest_path=args.manifest
+    )
+
+
+def cmd_json2csv(args, timings):
+    timings.load("labelstudiouploader").json_to_csv(args.input, args.output, return_df=False)
+
+
+def cmd_csv2json(args, timings):
+    timings.load("labelstudiouploader").csv_to_json(args.input, args.output)
+
+
+def cmd_upload(args, timings):
+    pd = timings.load("pandas")
+    compressedio = timings.load("compressedio")
+    dbuploader = timings.load("dbuploader")
+    validator = timings.load("validator")
+
+    with compressedio.open_text(args.csv, 'r', newline='') as f:
+        df = pd.read_csv(f)
+
+    if not args.skip_validation:
+        db_helper = dbuploader.DBHelper(compress=args.compress, connection=_connection(args))
+        try:
+            issues, summary = validator.validate_dataframe(df, db_helper, units=args.units)
+        finally:
+            db_helper.close()
+        if not validator.print_report(issues, summary):
+            return 1
+
+    image_data = dbuploader.convert_csv_to_image_data(df)
+
+    if not args.yes:
+        response = input("\n✓ Validation successful. Proceed with upload? (yes/no): ")
+        if response.lower() != 'yes':
+            return 1
+
+    dbuploader.upload_data(image_data, upload=True, upsert=args.upsert, batch_size=args.batch_size,
+                           new_names=args.new_names, compress=args.compress,
+                           connection=_connection(args))
+
+
+def cmd_reconstruct(args, timings):
+    dbdownloader = timings.load("dbdownloader")
+    filters = {key: getattr(args, key)
+               for key in ['project_id', 'site_name', 'email', 'date_from', 'date_to']
+               if getattr(args, key) is not None}
+    df = dbdownloader.reconstruct_csv(args.output, filters=filters or None, compress=args.compress,
+                                      connection=_connection(args))
+    if df is None:
+        return 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="data-manager", description="Annotation data management tools")
+    parser.add_argument("--timing-log", default=os.environ.get("DATAMANAGER_TIMING_LOG"),
+                        help="append a JSON line with startup/import/run times to this file")
+    parser.add_argument("--timings", action="store_true", help="print startup/import/run times")
+
+    db = argparse.ArgumentParser(add_help=False)
+    db.add_argument("--host", help="MySQL host (default: $DATAMANAGER_DB_HOST)")
+    db.add_argument("--user", help="MySQL user (default: $DATAMANAGER_DB_USER)")
+    db.add_argument("--password", help="MySQL password (default: $DATAMANAGER_DB_PASSWORD)")
+    db.add_argument("--database", help="MySQL database (default: $DATAMANAGER_DB_NAME)")
+    db.add_argument("--compress", action="store_true", help="enable MySQL protocol compression")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("labelstudio", help="build Label Studio tasks from a YOLO export folder")
+    p.add_argument("export_dir", help="folder containing images/, labels/ and notes.json")
+    p.add_argument("--images", help="images folder (default: EXPORT_DIR/images)")
+    p.add_argument("--labels", help="labels folder (default: EXPORT_DIR/labels)")
+    p.add_argument("--notes", help="notes.json path (default: EXPORT_DIR/notes.json)")
+    p.add_argument("-o", "--output", default="label_studio_tasks.json")
+    p.add_argument("--manifest", help="manifest file enabling incremental regeneration")
+    p.set_defaults(func=cmd_labelstudio)
+
+    p = commands.add_parser("json2csv", help="convert Label Studio JSON to annotation CSV")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.set_defaults(func=cmd_json2csv)
+
+    p = commands.add_parser("csv2json", help="convert annotation CSV to Label Studio JSON")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.set_defaults(func=cmd_csv2json)
+
+    p = commands.add_parser("upload", parents=[db], help="validate and upload an annotation CSV")
+    p.add_argument("csv")
+    p.add_argument("--upsert", action="store_true", help="diff and update existing images")
+    p.add_argument("--new-names", choices=["prompt", "create", "fail"], default="prompt",
+                   help="policy for classes/users not yet in the DB")
+    p.add_argument("--batch-size", type=int, default=500)
+    p.add_argument("--units", choices=["percent", "pixel"], default="percent",
+                   help="coordinate units for bounds validation")
+    p.add_argument("--skip-validation", action="store_true")
+    p.add_argument("-y", "--yes", action="store_true", help="upload without asking for confirmation")
+    p.set_defaults(func=cmd_upload)
+
+    p = commands.add_parser("reconstruct", parents=[db], help="export the database to an annotation CSV")
+    p.add_argument("output", nargs="?", default="reconstructed_annotations.csv")
+    p.add_argument("--project-id")
+    p.add_argument("--site-name")
+    p.add_argument("--email")
+    p.add_argument("--date-from")
+    p.add_argument("--date-to")
+    p.set_defaults(func=cmd_reconstruct)
+
+    return parser
+
+
+def _record_timings(args, timings, startup_s, run_s):
+    record = {
+        "command": args.command,
+        "startup_s": round(startup_s, 4),
+        "import_s": round(timings.import_s, 4),
+        "run_s": round(run_s - timings.import_s, 4),
+        "total_s": round(startup_s + run_s, 4),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if args.timings:
+        print(f"⏱  {json.dumps(record)}", file=sys.stderr)
+    if args.timing_log:
+        with open(args.timing_log, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    timings = _Timings()
+    startup_s = time.perf_counter() - _STARTED
+    start = time.perf_counter()
+    try:
+        with timings.track():
+            status = args.func(args, timings)
+    finally:
+        _record_timings(args, timings, startup_s, time.perf_counter() - start)
+    return status or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
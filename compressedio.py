@@ -0,0 +1,47 @@
+import gzip
+import os
+
+GZIP_EXTENSIONS = {'.gz', '.gzip'}
+ZSTD_EXTENSIONS = {'.zst', '.zstd'}
+
+
+def compression_for(path):
+    """Return 'gzip', 'zstd' or None depending on the file extension"""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in GZIP_EXTENSIONS:
+        return 'gzip'
+    if ext in ZSTD_EXTENSIONS:
+        return 'zstd'
+    return None
+
+
+def open_text(path, mode='r', encoding='utf-8', newline=None):
+    """
+    Open a text file for streaming, compressing or decompressing on the fly.
+
+    `.gz`/`.gzip` files go through gzip, `.zst`/`.zstd` files through the
+    optional `zstandard` package; anything else is opened as plain text.
+
+    Args:
+        path: File path
+        mode: 'r', 'w' or 'a'
+        encoding: Text encoding
+        newline: Passed through to the text wrapper (use '' for csv module)
+
+    Returns:
+        Text file object, usable as a context manager
+    """
+    mode = mode.replace('t', '')
+    compression = compression_for(path)
+
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding=encoding, newline=newline)
+
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"Reading or writing {path} requires the 'zstandard' package")
+        return zstandard.open(path, mode + 't', encoding=encoding, newline=newline)
+
+    return open(path, mode, encoding=encoding, newline=newline)
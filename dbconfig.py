@@ -0,0 +1,16 @@
+import os
+
+# Connection settings for the imgdata database; override via environment
+DB_SETTINGS = {
+    "host": os.environ.get("DATAMANAGER_DB_HOST", "192.168.2.241"),
+    "user": os.environ.get("DATAMANAGER_DB_USER", "root"),
+    "password": os.environ.get("DATAMANAGER_DB_PASSWORD", "password"),
+    "database": os.environ.get("DATAMANAGER_DB_NAME", "imgdata"),
+}
+
+
+def connection_settings(**overrides):
+    """DB_SETTINGS with any non-None overrides applied"""
+    settings = dict(DB_SETTINGS)
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return settings
@@ -1,14 +1,18 @@
 import mysql.connector
 import pandas as pd
+import itertools
+from array import array
+import random
 from datetime import datetime
+from annotationstore import AnnotationStore
+from compressedio import open_text
+from dbconfig import connection_settings
 
 class DBReader:
-    def __init__(self):
+    def __init__(self, compress=False, connection=None):
         self.db = mysql.connector.connect(
-            host="192.168.2.241",
-            user="root",
-            password="password",
-            database="imgdata"
+            **connection_settings(**(connection or {})),
+            compress=compress
         )
         self.cursor = self.db.cursor(dictionary=True)
     
@@ -115,6 +119,234 @@ class DBReader:
         
         return results
     
+    def fetch_store(self, filters=None):
+        """
+        Fetch data (optionally filtered) as a compact AnnotationStore.
+        
+        Args:
+            filters (dict): Same filter conditions as fetch_filtered_data
+        
+        Returns:
+            AnnotationStore with one record per image
+        """
+        data = self.fetch_filtered_data(filters) if filters else self.fetch_all_data()
+        df = pd.DataFrame(data, columns=[
+            'image_name', 'image_path', 'image_width', 'image_height',
+            'site_name', 'email', 'project_id', 'created_at',
+            'x1', 'y1', 'x2', 'y2', 'classname', 'contour'
+        ])
+        df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        return AnnotationStore.from_dataframe(df)
+    
+    def _image_filter_clause(self, filters):
+        """
+        SQL conditions on the images table (alias i) for the filter dict
+        accepted by fetch_filtered_data, plus their parameters.
+        """
+        conditions = []
+        params = []
+        if filters:
+            if 'project_id' in filters:
+                conditions.append("i.project = %s")
+                params.append(str(filters['project_id']))
+            if 'site_name' in filters:
+                conditions.append("i.site_name = %s")
+                params.append(filters['site_name'])
+            if 'email' in filters:
+                conditions.append("i.user_id IN (SELECT user_id FROM usr WHERE email = %s)")
+                params.append(filters['email'])
+            if 'date_from' in filters:
+                conditions.append("i.created_at >= %s")
+                params.append(filters['date_from'])
+            if 'date_to' in filters:
+                conditions.append("i.created_at <= %s")
+                params.append(filters['date_to'])
+        clause = "".join(f" AND {condition}" for condition in conditions)
+        return clause, params
+    
+    def fetch_images(self, image_ids):
+        """
+        Fetch annotation rows (CSV layout plus image_id) for a list of images.
+        
+        Rows come back ordered by image_id, annotation_id; the sort only
+        covers the requested images, never the whole table.
+        """
+        if not image_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(image_ids))
+        query = f"""
+        SELECT 
+            i.image_id,
+            i.image_name,
+            i.image_path,
+            i.width as image_width,
+            i.height as image_height,
+            i.site_name,
+            u.email,
+            i.project as project_id,
+            i.created_at,
+            a.x1,
+            a.y1,
+            a.x2,
+            a.y2,
+            c.class_name as classname,
+            m.contour
+        FROM images i
+        INNER JOIN annotations a ON i.image_id = a.image_id
+        INNER JOIN classes c ON a.class_id = c.class_id
+        INNER JOIN usr u ON i.user_id = u.user_id
+        LEFT JOIN mask m ON a.annotation_id = m.annotation_id
+        WHERE i.image_id IN ({placeholders})
+        ORDER BY i.image_id, a.annotation_id
+        """
+        self.cursor.execute(query, list(image_ids))
+        return self.cursor.fetchall()
+    
+    def iter_image_batches(self, batch_size=64, filters=None, after_id=0):
+        """
+        Iterate over images in pages of batch_size using keyset pagination.
+        
+        Each page is located with `image_id > last_seen ORDER BY image_id
+        LIMIT n`, which walks the primary key, so every page costs the same
+        regardless of how far into the table it is (no OFFSET, no global sort).
+        
+        Args:
+            batch_size: Number of images per page
+            filters (dict): Same filter conditions as fetch_filtered_data
+            after_id: Resume after this image_id
+        
+        Yields:
+            List of annotation rows (see fetch_images) for one page of images
+        """
+        clause, params = self._image_filter_clause(filters)
+        last_id = after_id
+        while True:
+            self.cursor.execute(
+                f"SELECT i.image_id FROM images i WHERE i.image_id > %s{clause} "
+                f"ORDER BY i.image_id LIMIT %s",
+                [last_id, *params, batch_size])
+            image_ids = [row['image_id'] for row in self.cursor.fetchall()]
+            if not image_ids:
+                return
+            last_id = image_ids[-1]
+            yield self.fetch_images(image_ids)
+    
+    def _shuffled_ids(self, rng, table, id_column, select_column, clause="", params=(),
+                      page_size=10000):
+        """
+        Yield every distinct select_column value of the matching rows exactly
+        once, in a seeded random order.
+        
+        The matching values are read once with keyset pages over id_column
+        (`id_column > last ORDER BY id_column LIMIT n`, no OFFSET), kept in a
+        compact int64 array and shuffled on the client with rng. Batches
+        drawn from the result are therefore uniform samples over the whole
+        population, whatever the id density, and each later page costs
+        nothing beyond fetching its own images.
+        """
+        values = array('q')
+        seen = set()
+        last_id = None
+        while True:
+            condition = f"{id_column} > %s" if last_id is not None else "1=1"
+            self.cursor.execute(
+                f"SELECT {id_column} as k, {select_column} as v FROM {table} "
+                f"WHERE {condition}{clause} ORDER BY {id_column} LIMIT %s",
+                ([last_id] if last_id is not None else []) + list(params) + [page_size])
+            rows = self.cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['k']
+            for row in rows:
+                if row['v'] not in seen:
+                    seen.add(row['v'])
+                    values.append(row['v'])
+        del seen
+        
+        rng.shuffle(values)
+        yield from values
+    
+    def iter_random_batches(self, batch_size=64, seed=0, filters=None, max_batches=None):
+        """
+        Iterate over reproducible random samples of images, without replacement.
+        
+        The matching image ids are listed once with keyset pages and shuffled
+        with the seeded RNG (see _shuffled_ids), so every batch is a uniform
+        sample over all matching images and a full iteration returns each
+        image exactly once. After that one-off id scan, each batch costs a
+        single fetch of its own images.
+        
+        Args:
+            batch_size: Number of images per batch
+            seed: Random seed; the same seed over the same data gives the same batches
+            filters (dict): Same filter conditions as fetch_filtered_data
+            max_batches: Stop after this many batches (default: until exhausted)
+        
+        Yields:
+            List of annotation rows (see fetch_images) for one batch of images
+        """
+        rng = random.Random(seed)
+        clause, params = self._image_filter_clause(filters)
+        ids = self._shuffled_ids(rng, "images i", "i.image_id", "i.image_id", clause, params)
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            image_ids = list(itertools.islice(ids, batch_size))
+            if not image_ids:
+                return
+            yield self.fetch_images(sorted(image_ids))
+            batches += 1
+    
+    def iter_stratified_batches(self, per_class=8, seed=0, class_names=None, max_batches=None):
+        """
+        Iterate over class-balanced random samples of images.
+        
+        Each batch holds up to per_class new images for every class, so rare
+        classes are represented as often as common ones. Per class, the
+        distinct images containing it are listed once with keyset pages over
+        annotation_id and shuffled with the seeded RNG (see _shuffled_ids),
+        so every image of the class is equally likely to be drawn. An image
+        is returned at most once even if it contains several classes, and a
+        class only drops out once all of its images have been handed out.
+        
+        Args:
+            per_class: Number of images drawn per class in each batch
+            seed: Random seed for reproducible batches
+            class_names: Restrict sampling to these classes (default: all)
+            max_batches: Stop after this many batches (default: until exhausted)
+        
+        Yields:
+            List of annotation rows (see fetch_images) for one batch of images
+        """
+        rng = random.Random(seed)
+        self.cursor.execute("SELECT class_id, class_name FROM classes ORDER BY class_id")
+        class_ids = [row['class_id'] for row in self.cursor.fetchall()
+                     if class_names is None or row['class_name'] in class_names]
+        
+        streams = {
+            class_id: self._shuffled_ids(rng, "annotations a", "a.annotation_id", "a.image_id",
+                                         " AND a.class_id = %s", [class_id])
+            for class_id in class_ids
+        }
+        seen = set()
+        batches = 0
+        while streams and (max_batches is None or batches < max_batches):
+            image_ids = []
+            for class_id, stream in list(streams.items()):
+                drawn = 0
+                while drawn < per_class:
+                    image_id = next(stream, None)
+                    if image_id is None:
+                        del streams[class_id]
+                        break
+                    if image_id not in seen:
+                        seen.add(image_id)
+                        image_ids.append(image_id)
+                        drawn += 1
+            if not image_ids:
+                return
+            yield self.fetch_images(sorted(image_ids))
+            batches += 1
+    
     def get_database_stats(self):
         """Get statistics about the database"""
         stats = {}
@@ -149,18 +381,20 @@ class DBReader:
         self.db.close()
 
 
-def reconstruct_csv(output_file='reconstructed_annotations.csv', filters=None):
+def reconstruct_csv(output_file='reconstructed_annotations.csv', filters=None, compress=False, connection=None):
     """
     Reconstruct CSV file from database.
     
     Args:
-        output_file: Name of the output CSV file
+        output_file: Name of the output CSV file (.gz / .zst to compress)
         filters: Optional dictionary with filter conditions
+        compress: Enable MySQL protocol compression on the connection
+        connection: Optional dict overriding host/user/password/database
     
     Returns:
         DataFrame with the reconstructed data
     """
-    db_reader = DBReader()
+    db_reader = DBReader(compress=compress, connection=connection)
     
     try:
         print("Fetching data from database...")
@@ -202,7 +436,8 @@ def reconstruct_csv(output_file='reconstructed_annotations.csv', filters=None):
         df = df[columns_order]
         
         # Save to CSV
-        df.to_csv(output_file, index=False)
+        with open_text(output_file, 'w', newline='') as f:
+            df.to_csv(f, index=False)
         print(f"\n✓ CSV file saved: {output_file}")
         
         # Show sample
@@ -3,62 +3,33 @@ from datetime import datetime
 import json
 import pandas as pd
 from collections import defaultdict
+from annotationstore import AnnotationStore
+from compressedio import open_text
+from validator import validate_dataframe, print_report
+from dbconfig import connection_settings
 def convert_csv_to_image_data(csv_file):
     """
-    Convert CSV with annotation data to the required nested dictionary format.
+    Convert CSV with annotation data to a compact AnnotationStore.
     
     Args:
-        csv_file_path: Path to the CSV file
+        csv_file: Path to the CSV file (.gz / .zst compressed ok), or an
+            already loaded DataFrame
         
     Returns:
-        List of dictionaries with image data and nested annotations
+        AnnotationStore; iterating it yields one record per image that
+        supports the old nested dict access (image['annotations'], ...)
     """
     # Read CSV file
-    if csv_file:
-        df = pd.read_csv(csv_file)
-    else:
+    if isinstance(csv_file, pd.DataFrame):
         df = csv_file
-    
-    # Strip whitespace from column names
-    df.columns = df.columns.str.strip()
+    else:
+        with open_text(csv_file, 'r', newline='') as f:
+            df = pd.read_csv(f)
     
     print(f"Processing CSV with {len(df)} rows...")
     
     # Group by image_path to combine annotations for the same image
-    image_dict = defaultdict(lambda: {
-        'annotations': []
-    })
-    
-    for _, row in df.iterrows():
-        image_path = row['image_path']
-        
-        # If this is the first time seeing this image, populate image-level fields
-        if not image_dict[image_path].get('image_name'):
-            image_dict[image_path].update({
-                'image_name': row['image_name'],
-                'image_path': row['image_path'],
-                'image_width': int(row['image_width']),
-                'image_height': int(row['image_height']),
-                'site_name': row['site_name'],
-                'usr': row['email'],
-                'project_id': int(row['project_id']),
-                'created_at': row['created_at']
-            })
-        
-        # Add annotation for this row
-        annotation = {
-            'x1': float(row['x1']),
-            'y1': float(row['y1']),
-            'x2': float(row['x2']),
-            'y2': float(row['y2']),
-            'classname': row['classname'],
-            'contour': row['contour']
-        }
-        
-        image_dict[image_path]['annotations'].append(annotation)
-    
-    # Convert defaultdict to list
-    image_data = list(image_dict.values())
+    image_data = AnnotationStore.from_dataframe(df)
     
     print(f"Converted to {len(image_data)} unique images")
     print(f"Total annotations: {len(df)}")
@@ -68,16 +39,24 @@ def convert_csv_to_image_data(csv_file):
 
 
 
+NEW_NAME_POLICIES = ("prompt", "create", "fail")
+
+
+def _is_null(name):
+    # Empty CSV cells arrive as NaN (float) from pandas
+    return name is None or (isinstance(name, float) and name != name)
+
+
 class DBHelper:
-    def __init__(self):
+    def __init__(self, compress=False, connection=None):
         self.db = mysql.connector.connect(
-            host="192.168.2.241",
-            user="root",
-            password="password",
-            database="imgdata"
+            **connection_settings(**(connection or {})),
+            compress=compress
         )
         self.cursor = self.db.cursor(dictionary=True)
         self.upload =True
+        # What to do with unseen class names / emails: 'prompt', 'create' or 'fail'
+        self.new_names = "prompt"
         
         # Cache class_id mappings
         self.cursor.execute("SELECT class_id, class_name FROM classes")
@@ -87,12 +66,89 @@ class DBHelper:
         self.cursor.execute("SELECT user_id, email FROM usr")
         self.usrid = {row["email"]: row["user_id"] for row in self.cursor.fetchall()}
 
+    def _confirm_new(self, kind, names):
+        """Apply the new_names policy to a list of unseen names"""
+        if self.new_names not in NEW_NAME_POLICIES:
+            raise ValueError(f"new_names must be one of {NEW_NAME_POLICIES}, got {self.new_names!r}")
+        if self.new_names == "create":
+            return
+        if self.new_names == "fail":
+            raise ValueError(f"Unknown {kind} name(s): {', '.join(map(str, names))}")
+        if len(names) == 1:
+            input(f"New {kind} '{names[0]}' ?. ctrl+c to stop")
+        else:
+            input(f"{len(names)} new {kind} names: {', '.join(map(str, names))} ?. ctrl+c to stop")
+
+    def resolve_names(self, class_names, emails):
+        """
+        Create all missing classes and users up front.
+        
+        Unseen names are confirmed once according to the new_names policy
+        and inserted in a single transaction, so the upload itself never
+        stops on a prompt. In dry-run mode they are only reported.
+        
+        Args:
+            class_names: Iterable of class names used by the incoming data
+            emails: Iterable of user emails used by the incoming data
+        
+        Returns:
+            Tuple (new class names, new emails)
+        
+        Raises:
+            ValueError: If a class name or email is empty, or new_names is
+                not a known policy
+        """
+        if self.new_names not in NEW_NAME_POLICIES:
+            raise ValueError(f"new_names must be one of {NEW_NAME_POLICIES}, got {self.new_names!r}")
+        
+        class_names, emails = set(class_names), set(emails)
+        if any(map(_is_null, class_names)):
+            raise ValueError("Incoming data contains annotations with an empty class name")
+        if any(map(_is_null, emails)):
+            raise ValueError("Incoming data contains images with an empty email")
+        
+        new_classes = sorted(class_names - set(self.classid))
+        new_users = sorted(emails - set(self.usrid))
+        
+        if new_classes:
+            self._confirm_new("class", new_classes)
+        if new_users:
+            self._confirm_new("user", new_users)
+        
+        if not self.upload:
+            # Placeholder ids so the dry run does not stop on these names again
+            self.classid.update(dict.fromkeys(new_classes))
+            self.usrid.update(dict.fromkeys(new_users))
+            return new_classes, new_users
+        
+        if new_classes:
+            self.cursor.executemany("INSERT INTO classes (class_name) VALUES (%s)",
+                                    [(name,) for name in new_classes])
+        if new_users:
+            self.cursor.executemany("INSERT INTO usr (email) VALUES (%s)",
+                                    [(email,) for email in new_users])
+        self.db.commit()
+        
+        # Read the generated ids back rather than relying on consecutive auto-increments
+        if new_classes:
+            placeholders = ", ".join(["%s"] * len(new_classes))
+            self.cursor.execute(f"SELECT class_id, class_name FROM classes WHERE class_name IN ({placeholders})",
+                                new_classes)
+            self.classid.update({row["class_name"]: row["class_id"] for row in self.cursor.fetchall()})
+        if new_users:
+            placeholders = ", ".join(["%s"] * len(new_users))
+            self.cursor.execute(f"SELECT user_id, email FROM usr WHERE email IN ({placeholders})",
+                                new_users)
+            self.usrid.update({row["email"]: row["user_id"] for row in self.cursor.fetchall()})
+        
+        return new_classes, new_users
+
     def get_user_id(self, email):
         """Get or create user_id for given email"""
         if email in self.usrid:
             return self.usrid[email]
         else:
-            input(f"New user '{email}' ?. ctrl+c to stop")
+            self._confirm_new("user", [email])
             insert_user_query = "INSERT INTO usr (email) VALUES (%s)"
             
             self.cursor.execute(insert_user_query, (email,))
@@ -106,7 +162,7 @@ class DBHelper:
         if class_name in self.classid:
             return self.classid[class_name]
         else:
-            input(f"New class '{class_name}' ?. ctrl+c to stop")
+            self._confirm_new("class", [class_name])
             insert_class_query = "INSERT INTO classes (class_name) VALUES (%s)"
             self.cursor.execute(insert_class_query, (class_name,))
             self.db.commit()
@@ -155,25 +211,315 @@ class DBHelper:
         self.cursor.execute("SELECT image_id, image_path FROM images")
         return {row['image_path']: row['image_id'] for row in self.cursor.fetchall()}
 
+    def find_existing_paths(self, image_paths, batch_size=1000):
+        """Return the subset of image_paths already in the DB, using batched IN lookups"""
+        existing = set()
+        for start in range(0, len(image_paths), batch_size):
+            batch = image_paths[start:start + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            self.cursor.execute(f"SELECT image_path FROM images WHERE image_path IN ({placeholders})", batch)
+            existing.update(row['image_path'] for row in self.cursor.fetchall())
+        return existing
+
+    def fetch_annotations(self, image_ids):
+        """
+        Fetch existing annotations and masks for a batch of images in one query.
+        
+        Returns:
+            Dict mapping image_id to a list of annotation rows
+            (annotation_id, class_id, x1, y1, x2, y2, contour)
+        """
+        existing = {image_id: [] for image_id in image_ids}
+        if not image_ids:
+            return existing
+        placeholders = ", ".join(["%s"] * len(image_ids))
+        self.cursor.execute(f"""
+            SELECT a.annotation_id, a.image_id, a.class_id, a.x1, a.y1, a.x2, a.y2, m.contour
+            FROM annotations a
+            LEFT JOIN mask m ON a.annotation_id = m.annotation_id
+            WHERE a.image_id IN ({placeholders})
+            ORDER BY a.annotation_id
+        """, list(image_ids))
+        for row in self.cursor.fetchall():
+            existing[row['image_id']].append(row)
+        return existing
+
+    def _new_annotation_ids(self, diff):
+        """
+        annotation_id of each row in diff.inserts, in the same order.
+        
+        Reads back the annotations of the affected images, skips the ids
+        that existed before the diff and matches the rest by image, class
+        and box; identical annotations are paired in insertion order.
+        """
+        image_ids = sorted({insert[0] for insert in diff.inserts})
+        placeholders = ", ".join(["%s"] * len(image_ids))
+        self.cursor.execute(f"""
+            SELECT annotation_id, image_id, class_id, x1, y1, x2, y2
+            FROM annotations
+            WHERE image_id IN ({placeholders})
+            ORDER BY annotation_id
+        """, image_ids)
+        
+        # Deleted ids are gone, so a reused id can only belong to a new row
+        previous = diff.known_ids - set(diff.deletes)
+        created = defaultdict(list)
+        for row in self.cursor.fetchall():
+            if row['annotation_id'] in previous:
+                continue
+            key = (row['image_id'], row['class_id'], *_coord_key(row['x1'], row['y1'], row['x2'], row['y2']))
+            created[key].append(row['annotation_id'])
+        
+        new_ids = []
+        for image_id, class_id, x1, y1, x2, y2, contour in diff.inserts:
+            candidates = created.get((image_id, class_id, *_coord_key(x1, y1, x2, y2)))
+            if not candidates:
+                raise RuntimeError(f"Inserted annotation not found for image_id {image_id}")
+            new_ids.append(candidates.pop(0))
+        return new_ids
+
+    def apply_annotation_diff(self, diff):
+        """
+        Apply an AnnotationDiff with batched statements and a single commit.
+        
+        Deletes use IN lists and updates a single CASE-based UPDATE, since
+        mysql-connector's executemany only batches INSERT/REPLACE. New
+        annotations go in as one multi-row INSERT; their ids are then read
+        back for the affected images (see _new_annotation_ids) so the masks
+        can be inserted in one batch as well.
+        """
+        if not self.upload:
+            return
+        
+        if diff.deletes:
+            placeholders = ", ".join(["%s"] * len(diff.deletes))
+            self.cursor.execute(f"DELETE FROM mask WHERE annotation_id IN ({placeholders})", diff.deletes)
+            self.cursor.execute(f"DELETE FROM annotations WHERE annotation_id IN ({placeholders})", diff.deletes)
+        
+        if diff.updates:
+            query, params = _case_update_query(diff.updates)
+            self.cursor.execute(query, params)
+        
+        mask_deletes = [annotation_id for annotation_id, contour in diff.mask_writes]
+        mask_inserts = [(annotation_id, contour) for annotation_id, contour in diff.mask_writes if contour]
+        
+        if diff.inserts:
+            self.cursor.executemany("""
+                INSERT INTO annotations (image_id, class_id, x1, y1, x2, y2)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, [insert[:6] for insert in diff.inserts])
+            new_ids = self._new_annotation_ids(diff)
+            mask_inserts.extend((annotation_id, insert[6])
+                                for annotation_id, insert in zip(new_ids, diff.inserts) if insert[6])
+        
+        if mask_deletes:
+            placeholders = ", ".join(["%s"] * len(mask_deletes))
+            self.cursor.execute(f"DELETE FROM mask WHERE annotation_id IN ({placeholders})", mask_deletes)
+        if mask_inserts:
+            self.cursor.executemany("INSERT INTO mask (annotation_id, contour) VALUES (%s, %s)", mask_inserts)
+        
+        self.db.commit()
+
     def close(self):
         """Close database connection"""
         self.cursor.close()
         self.db.close()
 
 
-def upload_data(image_data,upload):
-    """Main function to upload image data with annotations"""
-    db_helper = DBHelper()
+def _coord_key(x1, y1, x2, y2):
+    # Rounded so values read back from FLOAT columns still match the CSV
+    return (round(float(x1), 4), round(float(y1), 4), round(float(x2), 4), round(float(y2), 4))
+
+
+def _normalize_contour(contour):
+    """Contour as a JSON string, or None when the annotation has no mask"""
+    if isinstance(contour, (list, dict)):
+        return json.dumps(contour)
+    if not isinstance(contour, str) or not contour:
+        return None
+    return contour
+
+
+def _same_contour(a, b):
+    if a == b:
+        return True
+    if a is None or b is None:
+        return False
+    try:
+        return json.loads(a) == json.loads(b)
+    except ValueError:
+        return False
+
+
+def _case_update_query(updates):
+    """
+    Build one UPDATE statement applying all (class_id, x1, y1, x2, y2,
+    annotation_id) rows, using a CASE on annotation_id per column.
+    """
+    columns = ['class_id', 'x1', 'y1', 'x2', 'y2']
+    assignments = []
+    params = []
+    for position, column in enumerate(columns):
+        cases = " ".join(["WHEN %s THEN %s"] * len(updates))
+        assignments.append(f"{column} = CASE annotation_id {cases} END")
+        for update in updates:
+            params.extend([update[-1], update[position]])
+    ids = [update[-1] for update in updates]
+    params.extend(ids)
+    placeholders = ", ".join(["%s"] * len(ids))
+    query = f"UPDATE annotations SET {', '.join(assignments)} WHERE annotation_id IN ({placeholders})"
+    return query, params
+
+
+class AnnotationDiff:
+    """Pending inserts, updates and deletes for a batch of existing images"""
+    __slots__ = ('inserts', 'updates', 'deletes', 'mask_writes', 'unchanged', 'known_ids')
+
+    def __init__(self):
+        self.inserts = []       # (image_id, class_id, x1, y1, x2, y2, contour)
+        self.updates = []       # (class_id, x1, y1, x2, y2, annotation_id)
+        self.deletes = []       # annotation_id
+        self.mask_writes = []   # (annotation_id, contour or None)
+        self.unchanged = 0
+        self.known_ids = set()  # annotation_ids that existed before the diff
+
+    def add_image(self, image_id, existing_rows, incoming):
+        """
+        Diff one image's stored annotations against its incoming ones.
+        
+        Annotations with the same class and box are matched first (only the
+        mask is rewritten if the contour differs); leftovers are paired in
+        order and updated in place; any remainder is inserted or deleted.
+        
+        Args:
+            image_id: ID of the existing image
+            existing_rows: Rows from DBHelper.fetch_annotations for this image
+            incoming: List of (class_id, x1, y1, x2, y2, contour) tuples
+        """
+        by_key = defaultdict(list)
+        for row in existing_rows:
+            self.known_ids.add(row['annotation_id'])
+            key = (row['class_id'], *_coord_key(row['x1'], row['y1'], row['x2'], row['y2']))
+            by_key[key].append(row)
+        
+        unmatched = []
+        for class_id, x1, y1, x2, y2, contour in incoming:
+            candidates = by_key.get((class_id, *_coord_key(x1, y1, x2, y2)))
+            if not candidates:
+                unmatched.append((class_id, x1, y1, x2, y2, contour))
+                continue
+            row = candidates.pop(0)
+            if _same_contour(_normalize_contour(row['contour']), contour):
+                self.unchanged += 1
+            else:
+                self.mask_writes.append((row['annotation_id'], contour))
+        
+        leftovers = [row for rows in by_key.values() for row in rows]
+        leftovers.sort(key=lambda row: row['annotation_id'])
+        
+        for row, (class_id, x1, y1, x2, y2, contour) in zip(leftovers, unmatched):
+            self.updates.append((class_id, x1, y1, x2, y2, row['annotation_id']))
+            if not _same_contour(_normalize_contour(row['contour']), contour):
+                self.mask_writes.append((row['annotation_id'], contour))
+        
+        paired = min(len(leftovers), len(unmatched))
+        self.deletes.extend(row['annotation_id'] for row in leftovers[paired:])
+        self.inserts.extend((image_id, *annotation) for annotation in unmatched[paired:])
+
+    @property
+    def changed(self):
+        return bool(self.inserts or self.updates or self.deletes or self.mask_writes)
+
+
+def _upsert_batch(db_helper, batch):
+    """Diff and apply a batch of (image_id, image) pairs for existing images"""
+    existing = db_helper.fetch_annotations([image_id for image_id, _ in batch])
+    diff = AnnotationDiff()
+    changed_images = 0
+    for image_id, image in batch:
+        incoming = [
+            (db_helper.get_class_id(annotation['classname']),
+             annotation['x1'], annotation['y1'], annotation['x2'], annotation['y2'],
+             _normalize_contour(annotation.get('contour')))
+            for annotation in image['annotations']
+        ]
+        before = (len(diff.inserts), len(diff.updates), len(diff.deletes), len(diff.mask_writes))
+        diff.add_image(image_id, existing[image_id], incoming)
+        if before != (len(diff.inserts), len(diff.updates), len(diff.deletes), len(diff.mask_writes)):
+            changed_images += 1
+    db_helper.apply_annotation_diff(diff)
+    return diff, changed_images
+
+
+def collect_names(image_data, skip_paths=()):
+    """Distinct class names and emails used by image_data, ignoring images in skip_paths"""
+    images = [image for image in image_data if image['image_path'] not in skip_paths]
+    if isinstance(image_data, AnnotationStore):
+        store = image_data.select(images)
+        return store.distinct_classnames(), store.distinct_emails()
+    class_names = {annotation['classname'] for image in images for annotation in image['annotations']}
+    emails = {image['usr'] for image in images}
+    return class_names, emails
+
+
+def upload_data(image_data,upload, upsert=False, batch_size=500, new_names="prompt", compress=False, connection=None):
+    """
+    Main function to upload image data with annotations.
+    
+    Args:
+        image_data: AnnotationStore from convert_csv_to_image_data, or a
+            list of per-image dicts in the same nested format
+        upload: If False, run through the data without writing to the DB
+        upsert: If True, existing images are not skipped; their stored
+            annotations and masks are diffed against the incoming ones and
+            only the differences are written
+        batch_size: Number of existing images diffed per query in upsert mode
+        new_names: Policy for class names / emails not yet in the DB:
+            'prompt' asks once for all of them, 'create' adds them without
+            asking, 'fail' raises ValueError before anything is uploaded
+        compress: Enable MySQL protocol compression on the connection
+        connection: Optional dict overriding host/user/password/database
+    """
+    db_helper = DBHelper(compress=compress, connection=connection)
     db_helper.upload =upload
+    db_helper.new_names = new_names
     
     try:
         # Get existing images to avoid duplicates
         existing_images = db_helper.get_existing_image_ids()
         
+        # Create missing classes and users before touching any image, only for
+        # images that will be inserted (or diffed in upsert mode)
+        skip_paths = () if upsert else existing_images
+        new_classes, new_users = db_helper.resolve_names(*collect_names(image_data, skip_paths))
+        if new_classes or new_users:
+            print(f"New classes: {len(new_classes)}, new users: {len(new_users)}")
+        
         inserted_count = 0
         skipped_count = 0
+        changed_count = 0
+        totals = defaultdict(int)
+        pending = []
+        
+        def flush():
+            nonlocal changed_count
+            diff, changed_images = _upsert_batch(db_helper, pending)
+            changed_count += changed_images
+            totals['inserts'] += len(diff.inserts)
+            totals['updates'] += len(diff.updates)
+            totals['deletes'] += len(diff.deletes)
+            totals['masks'] += len(diff.mask_writes)
+            totals['unchanged'] += diff.unchanged
+            pending.clear()
         
         for image in image_data:
+            # Diff existing images against stored annotations in upsert mode
+            if upsert and image['image_path'] in existing_images:
+                pending.append((existing_images[image['image_path']], image))
+                if len(pending) >= batch_size:
+                    flush()
+                continue
+            
             # Skip if image already exists
             if image['image_path'] in existing_images:
                 print(f"Skipping existing image: {image['image_name']}")
@@ -223,9 +569,17 @@ def upload_data(image_data,upload):
             
             inserted_count += 1
         
+        if pending:
+            flush()
+        
         print(f"\nUpload complete!")
         print(f"Inserted: {inserted_count} images")
-        print(f"Skipped: {skipped_count} images (already exist)")
+        if upsert:
+            print(f"Updated: {changed_count} existing images "
+                  f"(+{totals['inserts']} / ~{totals['updates']} / -{totals['deletes']} annotations, "
+                  f"{totals['masks']} masks rewritten, {totals['unchanged']} unchanged)")
+        else:
+            print(f"Skipped: {skipped_count} images (already exist)")
         
     finally:
         db_helper.close()
@@ -235,25 +589,23 @@ def upload_data(image_data,upload):
 if __name__ == "__main__":
     csv = "output_annotations.csv"
     
-    # Test 1: Check CSV structure
-    df = pd.read_csv(csv)
-    required_cols = ['image_path', 'image_name', 'image_width', 'image_height', 
-                     'site_name', 'email', 'project_id', 'created_at',
-                     'x1', 'y1', 'x2', 'y2', 'classname', 'contour']
-    missing = set(required_cols) - set(df.columns)
-    if missing:
-        print(f"❌ Missing columns: {missing}")
+    # Test 1: Validate the data (vectorized, no dry-run upload)
+    with open_text(csv, 'r', newline='') as f:
+        df = pd.read_csv(f)
+    db_helper = DBHelper()
+    try:
+        issues, summary = validate_dataframe(df, db_helper)
+    finally:
+        db_helper.close()
+    if not print_report(issues, summary):
         exit(1)
     
     # Test 2: Convert data
-    image_data = convert_csv_to_image_data(csv)
+    image_data = convert_csv_to_image_data(df)
     print(f"Sample record: {image_data[0]}")
     
-    # Test 3: Dry run (no actual insert)
-    upload_data(image_data, upload=False)  # Fix the bug here!
-    
-    # Test 4: Confirm before real upload
-    response = input("\n✓ Dry run successful. Proceed with upload? (yes/no): ")
+    # Test 3: Confirm before real upload
+    response = input("\n✓ Validation successful. Proceed with upload? (yes/no): ")
     if response.lower() == 'yes':
         upload_data(image_data, upload=True)
 
@@ -2,18 +2,20 @@ import json
 import csv
 import os
 import datetime
-import pandas as pd
+from compressedio import open_text
 datetime.datetime.now()
-def json_to_csv(json_file_path, csv_file_path):
+def json_to_csv(json_file_path, csv_file_path, return_df=True):
     """
     Convert annotation JSON to CSV format.
     
     Args:
-        json_file_path: Path to input JSON file
-        csv_file_path: Path to output CSV file
+        json_file_path: Path to input JSON file (.gz / .zst compressed ok)
+        csv_file_path: Path to output CSV file (compressed by extension)
+        return_df: Return the rows as a DataFrame (imports pandas); if
+            False, return the number of rows written
     """
     # Read JSON data
-    with open(json_file_path, 'r') as f:
+    with open_text(json_file_path, 'r') as f:
         data = json.load(f)
     
     # Prepare CSV data
@@ -77,13 +79,17 @@ def json_to_csv(json_file_path, csv_file_path):
                   'x1', 'y1', 'x2', 'y2', 'classname', 'contour', 
                   'email', 'project_id', 'created_at']
     
-    with open(csv_file_path, 'w', newline='', encoding='utf-8') as f:
+    with open_text(csv_file_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(csv_rows)
     
     print(f"CSV file created: {csv_file_path}")
     print(f"Total rows: {len(csv_rows)}")
+    if not return_df:
+        return len(csv_rows)
+    # pandas is only needed here, so callers that skip the DataFrame don't pay for its import
+    import pandas as pd
     return pd.DataFrame(csv_rows)
 
 
@@ -92,13 +98,18 @@ def csv_to_json(csv_file_path, json_file_path):
     Convert CSV back to original JSON format.
     
     Args:
-        csv_file_path: Path to input CSV file
-        json_file_path: Path to output JSON file
+        csv_file_path: Path to input CSV file (.gz / .zst compressed ok),
+            or an AnnotationStore
+        json_file_path: Path to output JSON file (compressed by extension)
     """
     # Read CSV data
-    with open(csv_file_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        csv_data = list(reader)
+    if not isinstance(csv_file_path, (str, os.PathLike)):
+        # AnnotationStore (not imported here to keep this module light)
+        csv_data = csv_file_path.iter_rows()
+    else:
+        with open_text(csv_file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            csv_data = list(reader)
     
     # Group rows by image and project
     tasks_dict = {}
@@ -180,7 +191,7 @@ def csv_to_json(csv_file_path, json_file_path):
         task_id += 1
     
     # Write to JSON file
-    with open(json_file_path, 'w', encoding='utf-8') as f:
+    with open_text(json_file_path, 'w', encoding='utf-8') as f:
         json.dump(json_output, f, indent=4, ensure_ascii=False)
     
     print(f"JSON file created: {json_file_path}")
@@ -0,0 +1,44 @@
+import sqlite3
+
+
+class SqliteCursor:
+    """Minimal stand-in for a mysql.connector dictionary cursor over sqlite"""
+
+    def __init__(self, db):
+        self.cursor = db.cursor()
+
+    def execute(self, query, params=()):
+        self.cursor.execute(query.replace("%s", "?"), list(params))
+
+    def executemany(self, query, seq_params):
+        self.cursor.executemany(query.replace("%s", "?"), [list(params) for params in seq_params])
+
+    def fetchall(self):
+        columns = [d[0] for d in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+    def fetchone(self):
+        rows = self.fetchall()
+        return rows[0] if rows else None
+
+    def close(self):
+        self.cursor.close()
+
+
+SCHEMA = """
+    CREATE TABLE usr (user_id INTEGER PRIMARY KEY, email TEXT);
+    CREATE TABLE classes (class_id INTEGER PRIMARY KEY, class_name TEXT);
+    CREATE TABLE images (image_id INTEGER PRIMARY KEY, image_name TEXT, image_path TEXT,
+                         width INT, height INT, site_name TEXT, user_id INT, project TEXT,
+                         created_at TEXT);
+    CREATE TABLE annotations (annotation_id INTEGER PRIMARY KEY AUTOINCREMENT, image_id INT, class_id INT,
+                              x1 REAL, y1 REAL, x2 REAL, y2 REAL);
+    CREATE TABLE mask (annotation_id INT, contour TEXT);
+"""
+
+
+def connect():
+    """In-memory sqlite database with the imgdata schema"""
+    db = sqlite3.connect(":memory:")
+    db.executescript(SCHEMA)
+    return db
@@ -0,0 +1,49 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from annotationstore import AnnotationStore
+
+
+def make_df(**overrides):
+    data = {
+        'image_name': ['a.jpg', 'b.jpg', 'a.jpg'],
+        'image_path': ['/a.jpg', '/b.jpg', '/a.jpg'],
+        'image_width': [10, 20, 10],
+        'image_height': [10, 20, 10],
+        'site_name': ['S', 'T', 'S'],
+        'email': ['u@x', 'v@x', 'u@x'],
+        'project_id': [1, 2, 1],
+        'created_at': ['2024-01-01T00:00:00Z'] * 3,
+        'x1': [1.0, 2.0, 3.0],
+        'y1': [1.0, 2.0, 3.0],
+        'x2': [5.0, 6.0, 7.0],
+        'y2': [5.0, 6.0, 7.0],
+        'classname': ['A', 'B', 'A'],
+        'contour': ['[[1, 1]]', np.nan, '[[3, 3]]'],
+    }
+    data.update(overrides)
+    return pd.DataFrame(data)
+
+
+def test_groups_annotations_by_image():
+    store = AnnotationStore.from_dataframe(make_df())
+    assert [image['image_path'] for image in store] == ['/a.jpg', '/b.jpg']
+    first = store[0]
+    assert [a['x1'] for a in first['annotations']] == [1.0, 3.0]
+    assert first['annotations'][1]['contour'] == '[[3, 3]]'
+    assert store[1]['annotations'][0]['contour'] == ''
+    assert first['usr'] == 'u@x' and store[1]['site_name'] == 'T'
+
+
+def test_roundtrips_to_dataframe():
+    df = AnnotationStore.from_dataframe(make_df()).to_dataframe()
+    assert list(df['image_path']) == ['/a.jpg', '/a.jpg', '/b.jpg']
+    assert list(df['classname']) == ['A', 'A', 'B']
+
+
+def test_missing_image_path_names_rows():
+    df = make_df(image_path=['/a.jpg', np.nan, '/a.jpg'])
+    with pytest.raises(ValueError, match="Rows without image_path: 1"):
+        AnnotationStore.from_dataframe(df)
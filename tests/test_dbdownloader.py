@@ -0,0 +1,110 @@
+import pytest
+
+pytest.importorskip("mysql.connector")
+pytest.importorskip("pandas")
+
+from dbdownloader import DBReader
+from sqlite_cursor import SqliteCursor, connect
+
+
+def make_reader(image_ids, class_images):
+    """
+    DBReader over an in-memory database with the given image ids; every
+    image gets one annotation of class B, and the images listed in
+    class_images also get one of class A.
+    """
+    db = connect()
+    db.executescript("""
+        INSERT INTO usr VALUES (1, 'a@x');
+        INSERT INTO classes VALUES (1, 'A'), (2, 'B');
+    """)
+    db.executemany("INSERT INTO images VALUES (?, ?, ?, 10, 10, 'S', 1, '1', '2024-01-01')",
+                   [(i, f"{i}.jpg", f"/img/{i}.jpg") for i in image_ids])
+    db.executemany("INSERT INTO annotations (image_id, class_id, x1, y1, x2, y2) VALUES (?, 2, 0, 0, 1, 1)",
+                   [(i,) for i in image_ids])
+    db.executemany("INSERT INTO annotations (image_id, class_id, x1, y1, x2, y2) VALUES (?, 1, 0, 0, 1, 1)",
+                   [(i,) for i in class_images])
+    reader = DBReader.__new__(DBReader)
+    reader.db = db
+    reader.cursor = SqliteCursor(db)
+    return reader
+
+
+def batch_image_ids(batch):
+    return sorted({row['image_id'] for row in batch})
+
+
+def test_image_batches_page_over_all_images():
+    reader = make_reader(range(1, 101), [])
+    pages = [batch_image_ids(batch) for batch in reader.iter_image_batches(batch_size=30)]
+    assert [len(page) for page in pages] == [30, 30, 30, 10]
+    assert sum(pages, []) == list(range(1, 101))
+
+
+@pytest.mark.parametrize("image_ids", [range(1, 1001), list(range(1, 500)) + list(range(10000, 10501))])
+def test_random_batches_return_every_image_once(image_ids):
+    reader = make_reader(image_ids, [])
+    drawn = [i for batch in reader.iter_random_batches(batch_size=64, seed=1)
+             for i in batch_image_ids(batch)]
+    assert sorted(drawn) == sorted(image_ids)
+
+
+def test_random_batches_are_reproducible_and_shuffled():
+    reader = make_reader(range(1, 1001), [])
+    first = [batch_image_ids(b) for b in reader.iter_random_batches(batch_size=64, seed=7, max_batches=3)]
+    again = [batch_image_ids(b) for b in reader.iter_random_batches(batch_size=64, seed=7, max_batches=3)]
+    other = [batch_image_ids(b) for b in reader.iter_random_batches(batch_size=64, seed=8, max_batches=3)]
+    assert first == again
+    assert first != other
+    assert first[0] != list(range(1, 65))
+
+
+def test_random_batches_are_unbiased_across_id_gaps():
+    # Image 1000 follows a large gap; it must not be favoured
+    image_ids = list(range(1, 101)) + [1000]
+    reader = make_reader(image_ids, [])
+    hits = sum(1000 in batch_image_ids(next(reader.iter_random_batches(batch_size=10, seed=seed)))
+               for seed in range(300))
+    assert hits < 300 * 10 / 101 * 2
+
+
+def test_random_batches_follow_skewed_id_distribution():
+    # 92% of the images are dense ids 1-4600, the rest sparse ids up to 10M
+    dense = list(range(1, 4601))
+    sparse = list(range(25000, 10_000_001, 25000))
+    reader = make_reader(dense + sparse, [])
+    for seed in range(3):
+        for batch in reader.iter_random_batches(batch_size=64, seed=seed, max_batches=8):
+            ids = batch_image_ids(batch)
+            dense_share = sum(i <= 4600 for i in ids) / len(ids)
+            assert 0.75 <= dense_share <= 1.0
+
+
+def test_random_batches_span_the_whole_id_range():
+    reader = make_reader(range(1, 20001), [])
+    ids = batch_image_ids(next(reader.iter_random_batches(batch_size=64, seed=2)))
+    # A uniform sample of 64 out of 625 blocks of 32 ids touches about 61 blocks
+    assert len({(i - 1) // 32 for i in ids}) >= 55
+
+
+def test_stratified_batches_cover_rare_class_without_bias():
+    class_a = list(range(1, 11)) + [1000]
+    reader = make_reader(range(1, 1001), class_a)
+
+    drawn = [i for batch in reader.iter_stratified_batches(per_class=4, seed=3, class_names=['A'])
+             for i in batch_image_ids(batch)]
+    assert sorted(drawn) == class_a
+
+    hits = sum(1000 in batch_image_ids(next(reader.iter_stratified_batches(per_class=4, seed=seed,
+                                                                           class_names=['A'])))
+               for seed in range(300))
+    assert hits < 300 * 4 / 11 * 2
+
+
+def test_stratified_batches_keep_classes_until_exhausted():
+    class_a = list(range(1, 11)) + [1000]
+    reader = make_reader(range(1, 1001), class_a)
+    batches = list(reader.iter_stratified_batches(per_class=4, seed=5))
+    drawn = [i for batch in batches for i in batch_image_ids(batch)]
+    assert sorted(drawn) == list(range(1, 1001))
+    assert all(any(row['classname'] == 'A' for row in batch) for batch in batches[:3])
@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip("mysql.connector")
+pytest.importorskip("pandas")
+
+from dbuploader import AnnotationDiff, DBHelper, _case_update_query
+from sqlite_cursor import SqliteCursor, connect
+
+
+def existing(annotation_id, class_id, x1, y1, x2, y2, contour=None):
+    return {'annotation_id': annotation_id, 'image_id': 7, 'class_id': class_id,
+            'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2, 'contour': contour}
+
+
+def test_exact_match_with_same_contour_is_unchanged():
+    diff = AnnotationDiff()
+    # Float noise and JSON formatting differences still count as a match
+    diff.add_image(7, [existing(1, 1, 1.0, 1.0, 2.0, 2.0, '[[1, 2]]')],
+                   [(1, 1.00001, 1.0, 2.0, 2.0, '[[1,2]]')])
+    assert diff.unchanged == 1
+    assert not diff.changed
+
+
+def test_contour_only_change_rewrites_mask():
+    diff = AnnotationDiff()
+    diff.add_image(7, [existing(1, 1, 1.0, 1.0, 2.0, 2.0, '[[1, 2]]')],
+                   [(1, 1.0, 1.0, 2.0, 2.0, '[[3, 4]]')])
+    assert diff.mask_writes == [(1, '[[3, 4]]')]
+    assert not (diff.inserts or diff.updates or diff.deletes)
+
+
+def test_leftovers_are_updated_in_place():
+    diff = AnnotationDiff()
+    diff.add_image(7, [existing(1, 1, 1.0, 1.0, 2.0, 2.0, '[[1, 2]]')],
+                   [(2, 5.0, 5.0, 6.0, 6.0, '[[1, 2]]')])
+    assert diff.updates == [(2, 5.0, 5.0, 6.0, 6.0, 1)]
+    assert diff.mask_writes == []
+    assert not (diff.inserts or diff.deletes)
+
+
+def test_remainders_are_inserted_or_deleted():
+    diff = AnnotationDiff()
+    diff.add_image(7, [existing(1, 1, 1.0, 1.0, 2.0, 2.0), existing(2, 1, 3.0, 3.0, 4.0, 4.0)], [])
+    diff.add_image(8, [], [(1, 1.0, 1.0, 2.0, 2.0, '[[1, 1]]')])
+    assert diff.deletes == [1, 2]
+    assert diff.inserts == [(8, 1, 1.0, 1.0, 2.0, 2.0, '[[1, 1]]')]
+    assert diff.known_ids == {1, 2}
+
+
+def test_case_update_query_touches_only_listed_rows():
+    db = connect()
+    db.executemany("INSERT INTO annotations VALUES (?, 7, 1, 0, 0, 1, 1)", [(1,), (2,), (3,)])
+    query, params = _case_update_query([(5, 1, 2, 3, 4, 1), (6, 5, 6, 7, 8, 3)])
+    SqliteCursor(db).execute(query, params)
+    rows = db.execute("SELECT annotation_id, class_id, x1, y1, x2, y2 FROM annotations").fetchall()
+    assert rows == [(1, 5, 1, 2, 3, 4), (2, 1, 0, 0, 1, 1), (3, 6, 5, 6, 7, 8)]
+
+
+def test_apply_annotation_diff_batches_inserts_and_attaches_masks():
+    db = connect()
+    db.executemany("INSERT INTO annotations VALUES (?, ?, 1, ?, 0, 1, 1)",
+                   [(1, 7, 0), (2, 7, 5), (3, 8, 0)])
+    db.executemany("INSERT INTO mask VALUES (?, ?)", [(1, '[[0, 0]]'), (2, '[[5, 5]]')])
+
+    helper = DBHelper.__new__(DBHelper)
+    helper.db = db
+    helper.cursor = SqliteCursor(db)
+    helper.upload = True
+
+    stored = {7: [existing(1, 1, 0, 0, 1, 1, '[[0, 0]]'), existing(2, 1, 5, 0, 1, 1, '[[5, 5]]')],
+              8: [dict(existing(3, 1, 0, 0, 1, 1), image_id=8)]}
+    diff = AnnotationDiff()
+    diff.add_image(7, stored[7], [(1, 0, 0, 1, 1, '[[9, 9]]'),       # contour change
+                                  (1, 2, 2, 3, 3, '[[2, 2]]'),       # update of id 2
+                                  (2, 4, 4, 5, 5, '[[4, 4]]'),       # insert
+                                  (2, 4, 4, 5, 5, None)])            # identical box, no mask
+    diff.add_image(8, stored[8], [])                                 # delete id 3
+    helper.apply_annotation_diff(diff)
+
+    annotations = db.execute(
+        "SELECT annotation_id, image_id, class_id, x1 FROM annotations ORDER BY annotation_id").fetchall()
+    assert annotations == [(1, 7, 1, 0), (2, 7, 1, 2), (4, 7, 2, 4), (5, 7, 2, 4)]
+    masks = db.execute("SELECT annotation_id, contour FROM mask ORDER BY annotation_id").fetchall()
+    assert masks == [(1, '[[9, 9]]'), (2, '[[2, 2]]'), (4, '[[4, 4]]')]
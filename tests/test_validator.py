@@ -0,0 +1,115 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from validator import print_report, validate_dataframe
+
+
+def make_df(rows=2, **overrides):
+    data = {
+        'image_name': [f"{i}.jpg" for i in range(rows)],
+        'image_path': [f"/img/{i}.jpg" for i in range(rows)],
+        'image_width': [640] * rows,
+        'image_height': [480] * rows,
+        'site_name': ['S'] * rows,
+        'email': ['u@x'] * rows,
+        'project_id': [1] * rows,
+        'created_at': ['2024-01-01T10:00:00.000000Z'] * rows,
+        'x1': [10.0] * rows,
+        'y1': [10.0] * rows,
+        'x2': [20.0] * rows,
+        'y2': [20.0] * rows,
+        'classname': ['Kerb'] * rows,
+        'contour': ['[[10, 10], [20, 20], [10, 20]]'] * rows,
+    }
+    data.update(overrides)
+    return pd.DataFrame(data)
+
+
+def checks(df, **kwargs):
+    issues, summary = validate_dataframe(df, **kwargs)
+    return {(check, row) for check, row in zip(issues['check'], issues['row'])}, summary
+
+
+class FakeDBHelper:
+    classid = {'Kerb': 1}
+    usrid = {'u@x': 1}
+
+    def find_existing_paths(self, image_paths, batch_size=1000):
+        return {path for path in image_paths if path == '/img/0.jpg'}
+
+
+def test_clean_data_has_no_issues(capsys):
+    issues, summary = validate_dataframe(make_df())
+    assert issues.empty and summary['errors'] == 0
+    assert print_report(issues, summary)
+
+
+def test_missing_columns():
+    found, summary = checks(make_df().drop(columns=['contour']))
+    assert {check for check, _ in found} == {'missing_columns'}
+    assert summary['errors'] == 1
+
+
+def test_numeric_and_integer_types():
+    found, _ = checks(make_df(image_width=['wide', 640], project_id=[1, 1.5]))
+    assert ('type', 0) in found
+    assert ('type', 1) in found
+
+
+def test_text_columns_must_be_strings():
+    found, _ = checks(make_df(classname=['Kerb', 7]))
+    assert found == {('type', 1)}
+
+
+def test_missing_values():
+    found, _ = checks(make_df(email=['u@x', np.nan], x1=[np.nan, 10.0]))
+    assert ('missing_value', 0) in found
+    assert ('missing_value', 1) in found
+
+
+def test_bbox_order_and_bounds():
+    found, _ = checks(make_df(x1=[30.0, 10.0], x2=[20.0, 120.0]))
+    assert ('bbox_order', 0) in found
+    assert ('bbox_bounds', 1) in found
+    found, _ = checks(make_df(x2=[20.0, 700.0]), units='pixel')
+    assert ('bbox_bounds', 1) in found and ('bbox_bounds', 0) not in found
+
+
+def test_contour_json():
+    found, _ = checks(make_df(contour=['[[1, 2], [3]]', np.nan]))
+    assert found == {('contour', 0)}
+    found, _ = checks(make_df(contour=['not json', '[[1, 2]]']))
+    assert found == {('contour', 0)}
+
+
+@pytest.mark.parametrize("value", ['2024-01', 20240101, 'yesterday', np.nan])
+def test_timestamps_match_upload_parser(value):
+    found, _ = checks(make_df(created_at=['2024-01-01T10:00:00Z', value]))
+    assert ('timestamp', 1) in found
+    assert ('timestamp', 0) not in found
+
+
+def test_inconsistent_image_fields():
+    df = make_df(image_path=['/img/a.jpg', '/img/a.jpg'], image_name=['a.jpg', 'a.jpg'],
+                 image_width=[640, 800], x1=[10.0, 11.0])
+    found, _ = checks(df)
+    assert {('inconsistent_image', 0), ('inconsistent_image', 1)} <= found
+
+
+def test_duplicates_within_file_and_database():
+    df = make_df(rows=3, image_path=['/img/0.jpg', '/img/1.jpg', '/img/1.jpg'],
+                 image_name=['0.jpg', '1.jpg', '1.jpg'], email=['u@x', 'new@x', 'new@x'])
+    issues, summary = validate_dataframe(df, db_helper=FakeDBHelper())
+    found = set(zip(issues['check'], issues['row']))
+    assert ('duplicate_row', 2) in found
+    assert ('existing_image', 0) in found
+    assert summary['errors'] == 0 and summary['warnings'] == 2
+    assert summary['existing_images'] == 1
+    assert summary['new_emails'] == ['new@x']
+
+
+def test_new_classes_are_reported():
+    _, summary = validate_dataframe(make_df(classname=['Kerb', 'Pole']), db_helper=FakeDBHelper())
+    assert summary['new_classes'] == ['Pole']
@@ -0,0 +1,180 @@
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLUMNS = ['image_path', 'image_name', 'image_width', 'image_height',
+                    'site_name', 'email', 'project_id', 'created_at',
+                    'x1', 'y1', 'x2', 'y2', 'classname', 'contour']
+NUMERIC_COLUMNS = ['image_width', 'image_height', 'project_id', 'x1', 'y1', 'x2', 'y2']
+INTEGER_COLUMNS = ['image_width', 'image_height', 'project_id']
+TEXT_COLUMNS = ['image_path', 'image_name', 'site_name', 'email', 'classname']
+IMAGE_LEVEL_COLUMNS = ['image_name', 'image_width', 'image_height', 'site_name',
+                       'email', 'project_id', 'created_at']
+
+# Checks that block an upload; anything else is reported as a warning
+ERROR_CHECKS = {'missing_columns', 'type', 'missing_value', 'bbox_order', 'bbox_bounds',
+                'contour', 'timestamp', 'inconsistent_image'}
+
+
+def _valid_contour(contour):
+    """True if contour is a JSON list of [x, y] pairs"""
+    try:
+        points = json.loads(contour)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(points, list) and all(
+        isinstance(p, list) and len(p) == 2 and all(isinstance(v, (int, float)) for v in p)
+        for p in points)
+
+
+def _valid_timestamp(value):
+    """True if upload_data can parse value as created_at"""
+    if not isinstance(value, str):
+        return False
+    try:
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    return True
+
+
+def _invalid_values(series, is_valid):
+    """Distinct non-null values of series failing is_valid (one call per distinct value)"""
+    return [value for value in series.dropna().unique() if not is_valid(value)]
+
+
+def validate_dataframe(df, db_helper=None, units='percent', batch_size=1000):
+    """
+    Validate an annotation DataFrame before upload, column-wise.
+
+    Replaces the upload_data(..., upload=False) dry run: all checks are
+    vectorized over the DataFrame, and the only DB access is a batched
+    lookup of the distinct image paths plus the cached class/user maps.
+
+    Args:
+        df: DataFrame in the CSV column layout
+        db_helper: Optional DBHelper; enables duplicate and new-name checks
+        units: 'percent' if coordinates are percentages of the image size
+            (as produced by json_to_csv), 'pixel' if they are pixels
+        batch_size: Number of image paths per duplicate lookup query
+
+    Returns:
+        Tuple (issues, summary): issues is a DataFrame with one row per
+        problem (row, image_path, check, message); summary is a dict with
+        counts and the lists of new classes/emails
+    """
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    issues = []
+    summary = {'rows': len(df), 'images': 0, 'existing_images': 0,
+               'new_classes': [], 'new_emails': []}
+
+    def flag(mask, check, message):
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            rows = df.index[mask]
+            issues.append(pd.DataFrame({
+                'row': rows,
+                'image_path': df['image_path'].to_numpy()[mask] if 'image_path' in df else None,
+                'check': check,
+                'message': message
+            }))
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        issues.append(pd.DataFrame({'row': [None], 'image_path': [None], 'check': ['missing_columns'],
+                                    'message': [f"Missing columns: {missing}"]}))
+        return _finish(issues, summary)
+
+    summary['images'] = df['image_path'].nunique()
+
+    # Types
+    numeric = {}
+    for column in NUMERIC_COLUMNS:
+        numeric[column] = pd.to_numeric(df[column], errors='coerce')
+        flag(numeric[column].isna() & df[column].notna(), 'type', f"{column} is not numeric")
+        flag(df[column].isna(), 'missing_value', f"{column} is empty")
+    for column in INTEGER_COLUMNS:
+        flag(numeric[column].notna() & (numeric[column] % 1 != 0), 'type', f"{column} is not an integer")
+    for column in TEXT_COLUMNS:
+        flag(df[column].isna(), 'missing_value', f"{column} is empty")
+        not_text = _invalid_values(df[column], lambda value: isinstance(value, str))
+        flag(df[column].isin(not_text), 'type', f"{column} is not a string")
+
+    width, height = numeric['image_width'], numeric['image_height']
+    flag((width <= 0) | (height <= 0), 'type', "image size must be positive")
+
+    # Bounding boxes
+    x1, y1, x2, y2 = numeric['x1'], numeric['y1'], numeric['x2'], numeric['y2']
+    flag((x1 > x2) | (y1 > y2), 'bbox_order', "expected x1 <= x2 and y1 <= y2")
+    if units == 'pixel':
+        max_x, max_y = width, height
+    else:
+        max_x = max_y = 100
+    flag((x1 < 0) | (y1 < 0) | (x2 > max_x) | (y2 > max_y), 'bbox_bounds',
+         f"box outside the image ({units})")
+
+    # Contours: empty is allowed (no mask), otherwise must be a JSON point list
+    contours = df['contour']
+    present = contours.notna() & (contours.astype(str).str.len() > 0)
+    looks_like_list = contours.astype(str).str.strip().str.startswith('[')
+    candidates = present & looks_like_list
+    valid = np.zeros(len(df), dtype=bool)
+    valid[candidates.to_numpy()] = [_valid_contour(c) for c in contours[candidates]]
+    flag(present.to_numpy() & ~valid, 'contour', "contour is not a JSON list of [x, y] points")
+
+    # Timestamps, parsed exactly the way upload_data does (trailing Z = UTC)
+    bad_timestamps = _invalid_values(df['created_at'], _valid_timestamp)
+    flag(df['created_at'].isna() | df['created_at'].isin(bad_timestamps), 'timestamp',
+         "created_at is not a string accepted by datetime.fromisoformat")
+
+    # Image-level fields must agree across an image's rows
+    varying = df.groupby('image_path', sort=False)[IMAGE_LEVEL_COLUMNS].nunique(dropna=False)
+    inconsistent = varying.index[(varying > 1).any(axis=1)]
+    flag(df['image_path'].isin(inconsistent), 'inconsistent_image',
+         "image-level fields differ between rows of the same image")
+
+    # Duplicates within the file
+    flag(df.duplicated(subset=['image_path', 'classname', 'x1', 'y1', 'x2', 'y2', 'contour']),
+         'duplicate_row', "annotation repeated within the file")
+
+    if db_helper is not None:
+        paths = df['image_path'].dropna().unique().tolist()
+        existing = db_helper.find_existing_paths(paths, batch_size=batch_size)
+        summary['existing_images'] = len(existing)
+        flag(df['image_path'].isin(existing), 'existing_image', "image already in the database")
+        summary['new_classes'] = sorted(set(df['classname'].dropna()) - set(db_helper.classid), key=str)
+        summary['new_emails'] = sorted(set(df['email'].dropna()) - set(db_helper.usrid), key=str)
+
+    return _finish(issues, summary)
+
+
+def _finish(issues, summary):
+    if issues:
+        issues = pd.concat(issues, ignore_index=True)
+    else:
+        issues = pd.DataFrame(columns=['row', 'image_path', 'check', 'message'])
+    summary['errors'] = int(issues['check'].isin(ERROR_CHECKS).sum())
+    summary['warnings'] = len(issues) - summary['errors']
+    return issues, summary
+
+
+def print_report(issues, summary, max_examples=5):
+    """Print a short validation report; returns True if there are no errors"""
+    print(f"Validated {summary['rows']} rows / {summary['images']} images")
+    if summary['existing_images']:
+        print(f"  {summary['existing_images']} images already in the database")
+    if summary['new_classes']:
+        print(f"  New classes: {summary['new_classes']}")
+    if summary['new_emails']:
+        print(f"  New users: {summary['new_emails']}")
+
+    for (check, message), group in issues.groupby(['check', 'message'], sort=False):
+        level = "❌" if check in ERROR_CHECKS else "⚠️ "
+        print(f"{level} {check}: {message} ({len(group)} rows)")
+        for _, issue in group.head(max_examples).iterrows():
+            print(f"     row {issue['row']}: {issue['image_path']}")
+
+    print(f"Errors: {summary['errors']}, warnings: {summary['warnings']}")
+    return summary['errors'] == 0
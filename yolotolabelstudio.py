@@ -1,25 +1,199 @@
+import hashlib
 import json
 import os
+import textwrap
 from pathlib import Path
 from PIL import Image
+from compressedio import open_text
 
-def create_label_studio_json(images_folder, labels_folder, notes_json_path, output_path="label_studio_tasks.json", image_width=None, image_height=None):
+def _build_task(images_folder, labels_folder, img_file, notes):
+    """Build the Label Studio task for one image and its optional label file"""
+    img_path = os.path.join(images_folder, img_file)
+    img_name = Path(img_file).stem
+    
+    # Get image dimensions
+    try:
+        with Image.open(img_path) as img:
+            img_width, img_height = img.size
+    except:
+        print(f"Warning: Could not read image dimensions for {img_file}")
+        # img_width, img_height = 640, 480  # Default fallback
+    
+    # Create task structure
+    task = {
+        "data": {
+            "image": f"/data/local-files/?d={img_path}"
+        }
+    }
+    
+    # Add notes if available
+    if img_name in notes:
+        task["data"]["notes"] = notes[img_name]
+    
+    # Add predictions (pre-annotations) if label file exists
+    label_file = os.path.join(labels_folder, f"{img_name}.txt")
+    if os.path.exists(label_file):
+        predictions = []
+        
+        with open(label_file, 'r') as f:
+            for line_idx, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                
+                # Parse YOLO segmentation format: class x1 y1 x2 y2 x3 y3 ...
+                parts = line.split()
+                if len(parts) >= 7:  # At least class + 3 points (6 coordinates)
+                    class_id = int(parts[0])
+                    class_name = notes.get(class_id, f"{class_id}")
+                    
+                    # Extract polygon points (normalized coordinates)
+                    points = []
+                    for i in range(1, len(parts), 2):
+                        if i + 1 < len(parts):
+                            x = float(parts[i]) * 100  # Convert to percentage
+                            y = float(parts[i + 1]) * 100  # Convert to percentage
+                            points.append([x, y])
+                    
+                    # Create polygon prediction in Label Studio format
+                    prediction = {
+                        "id": f"{img_name}-{line_idx}",
+                        "from_name": "polygon",
+                        "to_name": "image",
+                        "original_width": img_width,
+                        "original_height": img_height,
+                        "image_rotation": 0,
+                        "value": {
+                            "points": points,
+                            "polygonlabels": [class_name],
+                            "closed": True
+                        },
+                        "type": "polygonlabels"
+                    }
+                    predictions.append(prediction)
+        
+        if predictions:
+            task["predictions"] = [{
+                "result": predictions,
+                "model_version": "pre-annotation"
+            }]
+    
+    return task
+
+
+def _file_digest(path):
+    """SHA-1 of a file's content, read in chunks"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_state(path, previous=None):
+    """
+    Return [size, mtime_ns, sha1] for path, or None if it does not exist.
+    
+    The content hash is only recomputed when size or mtime differ from the
+    previous state, so untouched files cost a single stat call.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+        return previous
+    return [st.st_size, st.st_mtime_ns, _file_digest(path)]
+
+
+def _same_content(state, previous):
+    if state is None or previous is None:
+        return state is previous
+    return state[0] == previous[0] and state[2] == previous[2]
+
+
+def _update_tasks_incrementally(images_folder, labels_folder, notes, images, output_path, manifest_path):
+    """
+    Regenerate only the tasks whose image or label file changed since the
+    last run and rewrite output_path from the cached task fragments.
+    
+    The manifest stores, per image file, the [size, mtime_ns, sha1] state of
+    the image and its label file together with the task serialized as a
+    JSON fragment. Changing the folders or class mapping invalidates it.
+    """
+    settings = {
+        "images_folder": images_folder,
+        "labels_folder": labels_folder,
+        "notes": hashlib.sha1(json.dumps(sorted(notes.items(), key=str)).encode()).hexdigest()
+    }
+    
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open_text(manifest_path, 'r') as f:
+            previous = json.load(f)
+        if previous.get("settings") == settings:
+            manifest = previous["files"]
+    
+    files = {}
+    regenerated = 0
+    for img_file in sorted(images):
+        img_path = os.path.join(images_folder, img_file)
+        label_file = os.path.join(labels_folder, f"{Path(img_file).stem}.txt")
+        entry = manifest.get(img_file, {})
+        
+        image_state = _file_state(img_path, entry.get("image"))
+        label_state = _file_state(label_file, entry.get("label"))
+        
+        if (entry and _same_content(image_state, entry["image"])
+                and _same_content(label_state, entry["label"])):
+            fragment = entry["task"]
+        else:
+            task = _build_task(images_folder, labels_folder, img_file, notes)
+            fragment = textwrap.indent(json.dumps(task, indent=2), '  ')
+            regenerated += 1
+        
+        files[img_file] = {"image": image_state, "label": label_state, "task": fragment}
+    
+    removed = len(set(manifest) - set(files))
+    
+    # Same layout as json.dump(tasks, f, indent=2)
+    with open_text(output_path, 'w') as f:
+        if files:
+            f.write("[\n")
+            f.write(",\n".join(entry["task"] for entry in files.values()))
+            f.write("\n]")
+        else:
+            f.write("[]")
+    
+    with open_text(manifest_path, 'w') as f:
+        json.dump({"settings": settings, "files": files}, f)
+    
+    print(f"♻️  Incremental update: {regenerated} regenerated, "
+          f"{len(files) - regenerated} reused, {removed} removed")
+    
+    return files
+
+
+def create_label_studio_json(images_folder, labels_folder, notes_json_path, output_path="label_studio_tasks.json", image_width=None, image_height=None, manifest_path=None):
     """
     Create Label Studio JSON format from images, contour labels, and notes.
     
     Args:
         images_folder: Path to folder containing images
         labels_folder: Path to folder containing label files (with contour/polygon data)
-        notes_json_path: Path to notes.json file
-        output_path: Output path for Label Studio JSON
+        notes_json_path: Path to notes.json file (.gz / .zst compressed ok)
+        output_path: Output path for Label Studio JSON (compressed by extension)
         image_width: Image width (optional, for normalized coordinates)
         image_height: Image height (optional, for normalized coordinates)
+        manifest_path: Optional manifest file enabling incremental mode; only
+            tasks whose image or label file changed since the last run are
+            regenerated
     """
     
     # Load notes if exists
     notes = {}
     if os.path.exists(notes_json_path):
-        with open(notes_json_path, 'r') as f:
+        with open_text(notes_json_path, 'r') as f:
             notes = json.load(f)
     notes = { x['id']:x['name'] for x in notes["categories"]}
     
@@ -41,84 +215,16 @@ def create_label_studio_json(images_folder, labels_folder, notes_json_path, outp
     images = [f for f in os.listdir(images_folder) 
               if Path(f).suffix.lower() in image_extensions]
     
-    tasks = []
-    
-    for img_file in sorted(images):
-        img_path = os.path.join(images_folder, img_file)
-        img_name = Path(img_file).stem
-        
-        # Get image dimensions
-        try:
-            with Image.open(img_path) as img:
-                img_width, img_height = img.size
-        except:
-            print(f"Warning: Could not read image dimensions for {img_file}")
-            # img_width, img_height = 640, 480  # Default fallback
-        
-        # Create task structure
-        task = {
-            "data": {
-                "image": f"/data/local-files/?d={img_path}"
-            }
-        }
-        
-        # Add notes if available
-        if img_name in notes:
-            task["data"]["notes"] = notes[img_name]
-        
-        # Add predictions (pre-annotations) if label file exists
-        label_file = os.path.join(labels_folder, f"{img_name}.txt")
-        if os.path.exists(label_file):
-            predictions = []
-            
-            with open(label_file, 'r') as f:
-                for line_idx, line in enumerate(f):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Parse YOLO segmentation format: class x1 y1 x2 y2 x3 y3 ...
-                    parts = line.split()
-                    if len(parts) >= 7:  # At least class + 3 points (6 coordinates)
-                        class_id = int(parts[0])
-                        class_name = notes.get(class_id, f"{class_id}")
-                        
-                        # Extract polygon points (normalized coordinates)
-                        points = []
-                        for i in range(1, len(parts), 2):
-                            if i + 1 < len(parts):
-                                x = float(parts[i]) * 100  # Convert to percentage
-                                y = float(parts[i + 1]) * 100  # Convert to percentage
-                                points.append([x, y])
-                        
-                        # Create polygon prediction in Label Studio format
-                        prediction = {
-                            "id": f"{img_name}-{line_idx}",
-                            "from_name": "polygon",
-                            "to_name": "image",
-                            "original_width": img_width,
-                            "original_height": img_height,
-                            "image_rotation": 0,
-                            "value": {
-                                "points": points,
-                                "polygonlabels": [class_name],
-                                "closed": True
-                            },
-                            "type": "polygonlabels"
-                        }
-                        predictions.append(prediction)
-            
-            if predictions:
-                task["predictions"] = [{
-                    "result": predictions,
-                    "model_version": "pre-annotation"
-                }]
-        
-        tasks.append(task)
-    
-    # Write to output file
-    with open(output_path, 'w') as f:
-        json.dump(tasks, f, indent=2)
+    if manifest_path:
+        tasks = _update_tasks_incrementally(images_folder, labels_folder, notes, images,
+                                            output_path, manifest_path)
+    else:
+        tasks = [_build_task(images_folder, labels_folder, img_file, notes)
+                 for img_file in sorted(images)]
+
+        # Write to output file
+        with open_text(output_path, 'w') as f:
+            json.dump(tasks, f, indent=2)
     
     print(f"✅ Created Label Studio import JSON with {len(tasks)} tasks")
     print(f"📁 Output saved to: {output_path}")